@@ -47,6 +47,13 @@ class ApplicationCharm(CharmBase):
         self.unit.set_workload_version(self._slurmctld.version())
         with self._slurmctld.config.edit() as config:
             config.cluster_name = "cluster"
+
+        # Start all the services needed by `slurmctld` together.
+        self._slurmctld.enable_services(
+            self._slurmctld.munge.service,
+            self._slurmctld.service,
+            self._slurmctld.exporter.service,
+        )
 ```
 """
 
@@ -59,10 +66,17 @@ __all__ = [
     "SlurmrestdManager",
 ]
 
+import base64
+import binascii
+import functools
+import importlib
+import json
 import logging
 import os
+import re
 import shutil
 import socket
+import stat
 import subprocess
 import textwrap
 from abc import ABC, abstractmethod
@@ -70,35 +84,21 @@ from collections.abc import Mapping
 from contextlib import contextmanager
 from enum import Enum
 from pathlib import Path
-from typing import Any, Optional, Union
-
-import distro
-import dotenv
-import yaml
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
-from slurmutils.editors import (
-    acctgatherconfig,
-    cgroupconfig,
-    gresconfig,
-    slurmconfig,
-    slurmdbdconfig,
-)
-from slurmutils.models import (
-    AcctGatherConfig,
-    CgroupConfig,
-    GRESConfig,
-    SlurmConfig,
-    SlurmdbdConfig,
-)
-
-try:
-    import charms.operator_libs_linux.v0.apt as apt
-except ImportError as e:
-    raise ImportError(
-        "`slurm_ops` requires the `charms.operator_libs_linux.v0.apt` charm library to work",
-        name=e.name,
-        path=e.path,
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, Generic, Optional, TypeVar, Union
+from urllib.parse import urlencode
+
+# `apt`, `cryptography`, `distro`, `http.client`, and `slurmutils` are imported where they are
+# used so that charms do not pay the cost of importing them in hooks that never need them.
+if TYPE_CHECKING:
+    import http.client
+
+    from slurmutils.models import (
+        AcctGatherConfig,
+        CgroupConfig,
+        GRESConfig,
+        SlurmConfig,
+        SlurmdbdConfig,
     )
 
 # The unique Charmhub library identifier, never change it
@@ -109,82 +109,371 @@ LIBAPI = 0
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 11
+LIBPATCH = 12
 
 # Charm library dependencies to fetch during `charmcraft pack`.
 PYDEPS = [
     "cryptography~=44.0.0",
-    "pyyaml>=6.0.2",
-    "python-dotenv~=1.0.1",
     "slurmutils~=0.10.0",
     "distro~=1.9.0",
 ]
 
 _logger = logging.getLogger(__name__)
 
+_SNAPD_SOCKET = Path("/run/snapd.socket")
+# Seconds to wait for a command to complete before killing it.
+_DEFAULT_TIMEOUT = 120
+_INSTALL_TIMEOUT = 600
+
+# Signing key of the Ubuntu HPC team's package archives.
+_UBUNTU_HPC_PPA_KEY = textwrap.dedent(
+    """
+    -----BEGIN PGP PUBLIC KEY BLOCK-----
+    Comment: Hostname:
+    Version: Hockeypuck 2.2
+
+    xsFNBGTuZb8BEACtJ1CnZe6/hv84DceHv+a54y3Pqq0gqED0xhTKnbj/E2ByJpmT
+    NlDNkpeITwPAAN1e3824Me76Qn31RkogTMoPJ2o2XfG253RXd67MPxYhfKTJcnM3
+    CEkmeI4u2Lynh3O6RQ08nAFS2AGTeFVFH2GPNWrfOsGZW03Jas85TZ0k7LXVHiBs
+    W6qonbsFJhshvwC3SryG4XYT+z/+35x5fus4rPtMrrEOD65hij7EtQNaE8owuAju
+    Kcd0m2b+crMXNcllWFWmYMV0VjksQvYD7jwGrWeKs+EeHgU8ZuqaIP4pYHvoQjag
+    umqnH9Qsaq5NAXiuAIAGDIIV4RdAfQIR4opGaVgIFJdvoSwYe3oh2JlrLPBlyxyY
+    dayDifd3X8jxq6/oAuyH1h5K/QLs46jLSR8fUbG98SCHlRmvozTuWGk+e07ALtGe
+    sGv78ToHKwoM2buXaTTHMwYwu7Rx8LZ4bZPHdersN1VW/m9yn1n5hMzwbFKy2s6/
+    D4Q2ZBsqlN+5aW2q0IUmO+m0GhcdaDv8U7RVto1cWWPr50HhiCi7Yvei1qZiD9jq
+    57oYZVqTUNCTPxi6NeTOdEc+YqNynWNArx4PHh38LT0bqKtlZCGHNfoAJLPVYhbB
+    b2AHj9edYtHU9AAFSIy+HstET6P0UDxy02IeyE2yxoUBqdlXyv6FL44E+wARAQAB
+    zRxMYXVuY2hwYWQgUFBBIGZvciBVYnVudHUgSFBDwsGOBBMBCgA4FiEErocSHcPk
+    oLD4H/Aj9tDF1ca+s3sFAmTuZb8CGwMFCwkIBwIGFQoJCAsCBBYCAwECHgECF4AA
+    CgkQ9tDF1ca+s3sz3w//RNawsgydrutcbKf0yphDhzWS53wgfrs2KF1KgB0u/H+u
+    6Kn2C6jrVM0vuY4NKpbEPCduOj21pTCepL6PoCLv++tICOLVok5wY7Zn3WQFq0js
+    Iy1wO5t3kA1cTD/05v/qQVBGZ2j4DsJo33iMcQS5AjHvSr0nu7XSvDDEE3cQE55D
+    87vL7lgGjuTOikPh5FpCoS1gpemBfwm2Lbm4P8vGOA4/witRjGgfC1fv1idUnZLM
+    TbGrDlhVie8pX2kgB6yTYbJ3P3kpC1ZPpXSRWO/cQ8xoYpLBTXOOtqwZZUnxyzHh
+    gM+hv42vPTOnCo+apD97/VArsp59pDqEVoAtMTk72fdBqR+BB77g2hBkKESgQIEq
+    EiE1/TOISioMkE0AuUdaJ2ebyQXugSHHuBaqbEC47v8t5DVN5Qr9OriuzCuSDNFn
+    6SBHpahN9ZNi9w0A/Yh1+lFfpkVw2t04Q2LNuupqOpW+h3/62AeUqjUIAIrmfeML
+    IDRE2VdquYdIXKuhNvfpJYGdyvx/wAbiAeBWg0uPSepwTfTG59VPQmj0FtalkMnN
+    ya2212K5q68O5eXOfCnGeMvqIXxqzpdukxSZnLkgk40uFJnJVESd/CxHquqHPUDE
+    fy6i2AnB3kUI27D4HY2YSlXLSRbjiSxTfVwNCzDsIh7Czefsm6ITK2+cVWs0hNQ=
+    =cs1s
+    -----END PGP PUBLIC KEY BLOCK-----
+    """
+)
+
+# Resource limits for nodes that need to be able to open many files at once.
+_ULIMIT_CONFIG = textwrap.dedent(
+    """
+    * soft nofile  1048576
+    * hard nofile  1048576
+    * soft memlock unlimited
+    * hard memlock unlimited
+    * soft stack unlimited
+    * hard stack unlimited
+    """
+)
+
+# systemd drop-in that starts `sackd` in configless mode.
+_SACKD_CONFIG_SERVER_OVERRIDE = textwrap.dedent(
+    """
+    [Service]
+    ExecStart=
+    ExecStart=/usr/sbin/sackd --systemd --conf-server $SACKD_CONFIG_SERVER
+    """
+)
+
+# systemd drop-in that raises the open file and locked memory limits of a service.
+_NOFILE_OVERRIDE = textwrap.dedent(
+    """
+    [Service]
+    LimitMEMLOCK=infinity
+    LimitNOFILE=1048576
+    """
+)
+
+# systemd drop-in that starts `slurmd` in configless mode if a config server is set.
+_SLURMD_CONFIG_SERVER_OVERRIDE = textwrap.dedent(
+    """
+    [Service]
+    ExecStart=
+    ExecStart=/usr/bin/sh -c "/usr/sbin/slurmd -D -s $${SLURMD_CONFIG_SERVER:+--conf-server $$SLURMD_CONFIG_SERVER} $$SLURMD_OPTIONS"
+    """
+)
+
+# systemd unit for `slurmrestd`, which is not shipped by the `slurmrestd` package.
+_SLURMRESTD_SERVICE = textwrap.dedent(
+    """
+    [Unit]
+    Description=Slurm REST daemon
+    After=network.target munge.service slurmctld.service
+    ConditionPathExists=/etc/slurm/slurm.conf
+    Documentation=man:slurmrestd(8)
+
+    [Service]
+    Type=simple
+    EnvironmentFile=-/etc/default/slurmrestd
+    Environment="SLURM_JWT=daemon"
+    ExecStart=/usr/sbin/slurmrestd $SLURMRESTD_OPTIONS -vv 0.0.0.0:6820
+    ExecReload=/bin/kill -HUP $MAINPID
+    User=slurmrestd
+    Group=slurmrestd
+
+    # Restart service if failed
+    Restart=on-failure
+    RestartSec=30s
+
+    [Install]
+    WantedBy=multi-user.target
+    """
+)
+
 
 class SlurmOpsError(Exception):
     """Exception raised when a slurm operation failed."""
 
-    @property
-    def message(self) -> str:
-        """Return message passed as argument to exception."""
-        return self.args[0]
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+
+
+_executables: dict[str, str] = {}
+
+
+def _resolve(cmd: str) -> Optional[str]:
+    """Resolve the absolute path of executable `cmd`.
+
+    Successful lookups are cached so that `PATH` is only searched once per executable.
+    Failed lookups are not cached as the executable may be installed later on.
+    """
+    if cmd not in _executables:
+        if (path := shutil.which(cmd)) is None:
+            return None
+
+        _executables[cmd] = path
+
+    return _executables[cmd]
 
 
 def _call(
-    cmd: str, *args: str, stdin: Optional[str] = None, check: bool = True
+    cmd: str,
+    *args: str,
+    stdin: Optional[str] = None,
+    check: bool = True,
+    capture: bool = True,
+    timeout: Optional[float] = _DEFAULT_TIMEOUT,
+    log_errors: bool = True,
 ) -> subprocess.CompletedProcess:
     """Call a command with logging.
 
     If the `check` argument is set to `False`, the command call
-    will not raise an error if the command fails.
+    will not raise an error if the command fails. If the `capture`
+    argument is set to `False`, the command's standard output is
+    discarded rather than piped back to the caller. If the `log_errors`
+    argument is set to `False`, an expected failure of the command is
+    only logged at debug level. The command is killed if it does not
+    complete within `timeout` seconds.
 
     Raises:
-        SlurmOpsError: Raised if the executed command fails.
+        SlurmOpsError: Raised if the executed command fails or times out.
     """
     cmd = [cmd, *args]
     _logger.debug(f"executing command {cmd}")
 
-    result = subprocess.run(cmd, input=stdin, capture_output=True, text=True)
+    try:
+        result = subprocess.run(
+            cmd,
+            executable=_resolve(cmd[0]),
+            input=stdin.encode() if stdin is not None else None,
+            stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            # File descriptors opened by Python are non-inheritable (PEP 446), so there is no
+            # need to have `subprocess` close every other descriptor in the child process.
+            close_fds=False,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        _logger.error(f"command {cmd} timed out after {timeout} seconds")
+        raise SlurmOpsError(f"command {cmd} timed out after {timeout} seconds")
+
+    # Output is captured as bytes and only decoded once here rather than
+    # being decoded incrementally as it is read from the pipes.
+    stdout = result.stdout.decode(errors="replace").strip() if capture and result.stdout else None
+    stderr = result.stderr.decode(errors="replace").strip() if result.stderr else None
     if result.returncode != 0:
-        _logger.error(f"command {cmd} failed with message {result.stderr}")
+        log = _logger.error if log_errors else _logger.debug
+        log(f"command {cmd} failed with message {stderr}")
         if check:
-            raise SlurmOpsError(f"command {cmd} failed. stderr:\n{result.stderr}")
+            raise SlurmOpsError(f"command {cmd} failed. stderr:\n{stderr}")
 
     return subprocess.CompletedProcess(
         args=result.args,
-        stdout=result.stdout.strip() if result.stdout else None,
-        stderr=result.stderr.strip() if result.stderr else None,
+        stdout=stdout,
+        stderr=stderr,
         returncode=result.returncode,
     )
 
 
-def _snap(*args) -> str:
+def _snap(
+    *args, capture: bool = True, timeout: Optional[float] = _DEFAULT_TIMEOUT
+) -> Optional[str]:
     """Control snap by via executed `snap ...` commands.
 
     Raises:
         SlurmOpsError: Raised if snap command fails.
     """
-    return _call("snap", *args).stdout
+    return _call("snap", *args, capture=capture, timeout=timeout).stdout
+
+
+def _connect_snapd(socket_path: Union[str, os.PathLike]) -> "http.client.HTTPConnection":
+    """Open an HTTP connection to the snapd REST API over its unix socket."""
+    import http.client
+
+    class _SnapdConnection(http.client.HTTPConnection):
+        def connect(self) -> None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(self.timeout)
+            self.sock.connect(str(socket_path))
+
+    return _SnapdConnection("localhost", timeout=_DEFAULT_TIMEOUT)
+
 
+def _snapd_errors() -> tuple[type[Exception], ...]:
+    """Return the errors that mean snapd could not be queried and `snap` should be used."""
+    import http.client
+
+    return OSError, json.JSONDecodeError, http.client.HTTPException
+
+
+_snapd_conn: Optional["http.client.HTTPConnection"] = None
+
+
+def _snapd_request(url: str) -> dict:
+    """Send a GET request to snapd over a connection kept open between requests."""
+    global _snapd_conn
+    if _snapd_conn is None:
+        _snapd_conn = _connect_snapd(_SNAPD_SOCKET)
+
+    try:
+        _snapd_conn.request("GET", url)
+        return json.loads(_snapd_conn.getresponse().read())
+    except Exception:
+        _snapd_conn.close()
+        _snapd_conn = None
+        raise
+
+
+def _snapd(path: str, **query: str) -> Any:
+    """Query the snapd REST API.
+
+    Querying snapd directly avoids the cost of spawning a `snap` process. The connection
+    to snapd is reused by subsequent queries made within the same hook.
+
+    Returns:
+        The `result` field of the response returned by snapd.
+
+    Raises:
+        SlurmOpsError: Raised if snapd returns an error response.
+        OSError: Raised if the snapd socket cannot be reached or the query times out.
+        json.JSONDecodeError: Raised if snapd returns a malformed response.
+        http.client.HTTPException: Raised if snapd returns an invalid HTTP response.
+    """
+    url = f"{path}?{urlencode(query)}" if query else path
+    _logger.debug("querying snapd api endpoint %s", url)
+
+    try:
+        response = _snapd_request(url)
+    except (BrokenPipeError, ConnectionResetError):
+        # snapd may have closed the idle connection since the last query. Retry once.
+        _logger.debug("snapd closed the connection. reconnecting")
+        response = _snapd_request(url)
+
+    if response.get("type") == "error":
+        raise SlurmOpsError(
+            f"snapd api request {url} failed. reason: {response['result']['message']}"
+        )
 
-def _systemctl(*args) -> str:
+    return response["result"]
+
+
+def _write_atomic(file: Path, content: Union[str, bytes], mode: int = 0o644) -> None:
+    """Replace the contents of `file` without exposing a partially written file.
+
+    The new contents are written and flushed to disk in a temporary file next to `file`,
+    which is then renamed over `file`. The mode and ownership of `file` are preserved
+    if it already exists, otherwise the new file is created with `mode`. The temporary
+    file is created with its final mode before anything is written to it.
+    """
+    info = file.stat() if file.exists() else None
+    if info is not None:
+        mode = stat.S_IMODE(info.st_mode)
+
+    tmp = file.with_name(f".{file.name}.tmp")
+    # Remove any temporary file left behind by an interrupted write.
+    tmp.unlink(missing_ok=True)
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+    with open(fd, "wb" if isinstance(content, bytes) else "w") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if info is not None:
+        os.chmod(tmp, mode)
+        os.chown(tmp, info.st_uid, info.st_gid)
+
+    os.replace(tmp, file)
+
+
+def _write_if_changed(file: Path, content: str) -> bool:
+    """Atomically replace the contents of `file` with `content` if they differ.
+
+    Returns:
+        True if `file` was written, False if it already contained `content`.
+    """
+    try:
+        if file.read_text() == content:
+            _logger.debug("%s is up to date. skipping write", file)
+            return False
+    except FileNotFoundError:
+        pass
+
+    _write_atomic(file, content)
+    return True
+
+
+def _require_apt() -> ModuleType:
+    """Import the `charms.operator_libs_linux.v0.apt` charm library.
+
+    Raises:
+        ImportError: Raised if the `apt` charm library has not been fetched.
+    """
+    try:
+        import charms.operator_libs_linux.v0.apt as apt
+    except ImportError as e:
+        raise ImportError(
+            "`slurm_ops` requires the `charms.operator_libs_linux.v0.apt` charm library to work",
+            name=e.name,
+            path=e.path,
+        )
+
+    return apt
+
+
+def _systemctl(*args, capture: bool = True) -> Optional[str]:
     """Control systemd units via `systemctl ...` commands.
 
     Raises:
         SlurmOpsError: Raised if systemctl command fails.
     """
-    return _call("systemctl", *args).stdout
+    return _call("systemctl", *args, capture=capture).stdout
 
 
-def _mungectl(*args, stdin: Optional[str] = None) -> str:
+def _mungectl(*args, stdin: Optional[str] = None, capture: bool = True) -> Optional[str]:
     """Control munge via `mungectl ...` commands.
 
     Raises:
         SlurmOpsError: Raised if mungectl command fails.
     """
-    return _call("mungectl", *args, stdin=stdin).stdout
+    return _call("mungectl", *args, stdin=stdin, capture=capture).stdout
 
 
 class _ServiceType(Enum):
@@ -201,166 +490,216 @@ class _ServiceType(Enum):
     @property
     def config_name(self) -> str:
         """Configuration name on the slurm snap for this service type."""
-        if self is _ServiceType.SLURMCTLD:
-            return "slurm"
+        return _CONFIG_NAMES[self]
+
+    @property
+    def snap_name(self) -> str:
+        """Name of this service type's app in the slurm snap."""
+        return _SNAP_NAMES[self]
+
+
+_CONFIG_NAMES = {service: service.value for service in _ServiceType}
+_CONFIG_NAMES[_ServiceType.SLURMCTLD] = "slurm"
+_SNAP_NAMES = {service: f"slurm.{service.value}" for service in _ServiceType}
+
+# Leading epoch of a Debian package version, e.g. `1:` in `1:23.11.7-2ubuntu1`.
+_EPOCH = re.compile(r"^\d+:")
 
-        return self.value
+_ENV_KEY = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_ENV_LINE = re.compile(r"\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(.*?)\s*$")
+# Single-quoted values are taken literally. Double-quoted values may escape `"`, `\`, `` ` ``,
+# and `$` with a backslash, which is how systemd's `EnvironmentFile=` and `sh` read them.
+_ENV_QUOTED = re.compile(r"'([^']*)'|\"((?:\\.|[^\"\\])*)\"")
+_ENV_ESCAPE = re.compile(r'\\([\\"`$])')
+_ENV_SPECIAL = re.compile(r'([\\"`$])')
 
 
 class _EnvManager:
     """Control configuration of environment variables used in Slurm components.
 
-    Every configuration value is automatically uppercased.
+    Every configuration value is automatically uppercased. The environment file is only
+    re-parsed if it has been modified since it was last read, and every `set` or `unset`
+    rewrites the environment file in a single pass if any variables were changed.
     """
 
     def __init__(self, file: Union[str, os.PathLike]) -> None:
         self._file: Path = Path(file)
+        self._env: dict[str, Optional[str]] = {}
+        self._stamp: Optional[tuple[int, int, int]] = None
 
     def get(self, key: str) -> Optional[str]:
         """Get specific environment variable for service."""
-        return dotenv.get_key(self._file, key.upper())
+        return self._load().get(key.upper())
 
     def set(self, config: Mapping[str, Any]) -> None:
-        """Set environment variable for service."""
-        for key, value in config.items():
-            dotenv.set_key(self._file, key.upper(), str(value))
-
-    def unset(self, key: str) -> None:
-        """Unset environment variable for service."""
-        dotenv.unset_key(self._file, key.upper())
-
-
-class _ConfigManager(ABC):
-    """Control a Slurm configuration file."""
-
-    def __init__(self, config_path: Union[str, Path], user: str, group: str) -> None:
-        self._config_path = config_path
-        self._user = user
-        self._group = group
-
-    @abstractmethod
-    def load(self):
-        """Load the current configuration from the configuration file."""
-
-    @abstractmethod
-    def dump(self, config) -> None:
-        """Dump new configuration into configuration file.
+        """Set environment variables for service.
 
         Notes:
-            Overwrites current configuration file. If just updating the
-            current configuration, use `edit` instead.
+            Pass all the variables that need to be updated in a single mapping
+            rather than calling `set` once per variable.
         """
+        self._update({key.upper(): str(value) for key, value in config.items()})
 
-    @contextmanager
-    @abstractmethod
-    def edit(self):
-        """Edit the current configuration file."""
+    def unset(self, *keys: str) -> None:
+        """Unset environment variables for service."""
+        self._update({key.upper(): None for key in keys})
 
+    def _load(self) -> dict[str, Optional[str]]:
+        """Load the environment file if it has been modified since it was last read."""
+        try:
+            info = self._file.stat()
+        except FileNotFoundError:
+            self._env, self._stamp = {}, None
+            return self._env
 
-class _AcctGatherConfigManager(_ConfigManager):
-    """Manage the `acct_gather.conf` configuration file."""
+        # The file may be replaced by another `_EnvManager` within the same timestamp tick,
+        # e.g. for the snap's shared `.env` file. `_write_atomic` gives each write a new inode.
+        stamp = (info.st_ino, info.st_mtime_ns, info.st_size)
+        if stamp != self._stamp:
+            bindings = map(self._parse, self._file.read_text().splitlines())
+            self._env = dict(binding for binding in bindings if binding is not None)
+            self._stamp = stamp
 
-    def load(self) -> AcctGatherConfig:
-        """Load the current `acct_gather.conf` configuration file."""
-        return acctgatherconfig.load(self._config_path)
+        return self._env
 
-    def dump(self, config: AcctGatherConfig) -> None:
-        """Dump new configuration into `acct_gather.conf` configuration file."""
-        acctgatherconfig.dump(
-            config, self._config_path, mode=0o600, user=self._user, group=self._group
-        )
+    def _update(self, changes: Mapping[str, Optional[str]]) -> None:
+        """Apply changes to the environment file in a single write.
 
-    @contextmanager
-    def edit(self) -> AcctGatherConfig:
-        """Edit the current `acct_gather.conf` configuration file."""
-        with acctgatherconfig.edit(
-            self._config_path, mode=0o600, user=self._user, group=self._group
-        ) as config:
-            yield config
+        Args:
+            changes: Variables to update. Variables mapped to `None` are removed.
 
+        Raises:
+            SlurmOpsError: Raised if a variable name or value cannot be written to the file.
+        """
+        for key, value in changes.items():
+            if not _ENV_KEY.fullmatch(key):
+                raise SlurmOpsError(f"invalid environment variable name {key}")
+            if value is not None and "\n" in value:
+                raise SlurmOpsError(f"value of environment variable {key} contains a newline")
+
+        current = self._load()
+        if all(current.get(key) == value for key, value in changes.items()):
+            _logger.debug("environment file %s is up to date. skipping write", self._file)
+            return
+
+        pending = dict(changes)
+        content = []
+        if self._file.exists():
+            for line in self._file.read_text().splitlines(keepends=True):
+                binding = self._parse(line)
+                if binding is None or binding[0] not in changes:
+                    content.append(line if line.endswith("\n") else line + "\n")
+                elif (value := pending.pop(binding[0], None)) is not None:
+                    content.append(self._format(binding[0], value))
+
+        content.extend(self._format(k, v) for k, v in pending.items() if v is not None)
+        _write_atomic(self._file, "".join(content))
+        # Force the environment file to be re-parsed on the next read.
+        self._stamp = None
+
+    @staticmethod
+    def _parse(line: str) -> Optional[tuple[str, str]]:
+        """Parse a `KEY=value` line from an environment file.
+
+        Values may be single-quoted, double-quoted, or unquoted. Single-quoted values are
+        read literally, and only double quotes, backslashes, backticks, and dollar signs
+        are escaped in double-quoted values. Unquoted values end at the start of an inline
+        comment. Lines that do not assign a variable, such as comments and blank lines,
+        return `None`.
+        """
+        match = _ENV_LINE.match(line)
+        if match is None:
+            return None
 
-class _CgroupConfigManager(_ConfigManager):
-    """Control the `cgroup.conf` configuration file."""
+        key, value = match.groups()
+        if quoted := _ENV_QUOTED.match(value):
+            single, double = quoted.groups()
+            return key, single if single is not None else _ENV_ESCAPE.sub(r"\1", double)
 
-    def load(self) -> CgroupConfig:
-        """Load the current `cgroup.conf` configuration file."""
-        return cgroupconfig.load(self._config_path)
+        return key, value.split(" #", 1)[0].rstrip()
 
-    def dump(self, config: CgroupConfig) -> None:
-        """Dump new configuration into `cgroup.conf` configuration file."""
-        cgroupconfig.dump(
-            config, self._config_path, mode=0o644, user=self._user, group=self._group
-        )
+    @staticmethod
+    def _format(key: str, value: str) -> str:
+        """Format a variable as a double-quoted `KEY="value"` line."""
+        value = _ENV_SPECIAL.sub(r"\\\1", value)
+        return f'{key}="{value}"\n'
 
-    @contextmanager
-    def edit(self) -> CgroupConfig:
-        """Edit the current `cgroup.conf` configuration file."""
-        with cgroupconfig.edit(
-            self._config_path, mode=0o644, user=self._user, group=self._group
-        ) as config:
-            yield config
 
+_C = TypeVar("_C")
 
-class _GRESConfigManager(_ConfigManager):
-    """Manage the `gres.conf` configuration file."""
 
-    def load(self) -> GRESConfig:
-        """Load the current `gres.conf` configuration files."""
-        return gresconfig.load(self._config_path)
+class _ConfigManager(Generic[_C]):
+    """Control a Slurm configuration file.
 
-    def dump(self, config: GRESConfig) -> None:
-        """Dump new configuration into `gres.conf` configuration file."""
-        gresconfig.dump(config, self._config_path, mode=0o644, user=self._user, group=self._group)
+    Args:
+        config_path: Path to the configuration file.
+        user: User that owns the configuration file.
+        group: Group that owns the configuration file.
+        editor: Name of the `slurmutils.editors` module that edits the configuration file.
+        mode: Access permissions of the configuration file.
+    """
 
-    @contextmanager
-    def edit(self) -> GRESConfig:
-        """Edit the current `gres.conf` configuration file."""
-        with gresconfig.edit(
-            self._config_path, mode=0o644, user=self._user, group=self._group
-        ) as config:
-            yield config
+    def __init__(
+        self, config_path: Union[str, Path], user: str, group: str, editor: str, mode: int
+    ) -> None:
+        self._config_path = config_path
+        self._user = user
+        self._group = group
+        self._editor_name = editor
+        self._mode = mode
 
+    @property
+    def _editor(self) -> ModuleType:
+        return importlib.import_module(f"slurmutils.editors.{self._editor_name}")
 
-class _SlurmConfigManager(_ConfigManager):
-    """Control the `slurm.conf` configuration file."""
+    def load(self) -> _C:
+        """Load the current configuration from the configuration file."""
+        return self._editor.load(self._config_path)
 
-    def load(self) -> SlurmConfig:
-        """Load the current `slurm.conf` configuration file."""
-        return slurmconfig.load(self._config_path)
+    def dump(self, config: _C) -> None:
+        """Dump new configuration into configuration file.
 
-    def dump(self, config: SlurmConfig) -> None:
-        """Dump new configuration into `slurm.conf` configuration file."""
-        slurmconfig.dump(config, self._config_path, mode=0o644, user=self._user, group=self._group)
+        Notes:
+            Overwrites current configuration file. If just updating the
+            current configuration, use `edit` instead.
+        """
+        self._editor.dump(
+            config, self._config_path, mode=self._mode, user=self._user, group=self._group
+        )
 
     @contextmanager
-    def edit(self) -> SlurmConfig:
-        """Edit the current `slurm.conf` configuration file."""
-        with slurmconfig.edit(
-            self._config_path, mode=0o644, user=self._user, group=self._group
-        ) as config:
-            yield config
+    def edit(self) -> _C:
+        """Edit the current configuration file.
 
+        The configuration file is only rewritten if the edited configuration
+        differs from the current contents of the file.
+        """
+        current, config = self._open()
+        yield config
+        self._save(current, self._editor.dumps(config))
 
-class _SlurmdbdConfigManager(_ConfigManager):
-    """Control the `slurmdbd.conf` configuration file."""
+    def _open(self) -> tuple[Optional[str], _C]:
+        """Read the current contents of the configuration file and parse them."""
+        file = Path(self._config_path)
+        if file.exists():
+            current = file.read_text()
+        else:
+            _logger.warning("file %s not found. creating new empty configuration", file)
+            current = None
 
-    def load(self) -> SlurmdbdConfig:
-        """Load the current `slurmdbd.conf` configuration file."""
-        return slurmdbdconfig.load(self._config_path)
+        return current, self._editor.loads(current or "")
 
-    def dump(self, config: SlurmdbdConfig) -> None:
-        """Dump new configuration into `slurmdbd.conf` configuration file."""
-        slurmdbdconfig.dump(
-            config, self._config_path, mode=0o600, user=self._user, group=self._group
-        )
+    def _save(self, current: Optional[str], new: str) -> None:
+        """Write serialised configuration to the file if it differs from `current`."""
+        from slurmutils.editors.editor import set_file_permissions
 
-    @contextmanager
-    def edit(self) -> SlurmdbdConfig:
-        """Edit the current `slurmdbd.conf` configuration file."""
-        with slurmdbdconfig.edit(
-            self._config_path, mode=0o600, user=self._user, group=self._group
-        ) as config:
-            yield config
+        file = Path(self._config_path)
+        if new == current:
+            _logger.debug("configuration in %s is unchanged. skipping write", file)
+        else:
+            file.write_text(new)
+
+        set_file_permissions(file, self._mode, self._user, self._group)
 
 
 class _ServiceManager(ABC):
@@ -400,49 +739,66 @@ class _SystemctlServiceManager(_ServiceManager):
         Raises:
             SlurmOpsError: Raised if `systemctl enable ...` returns a non-zero returncode.
         """
-        _systemctl("enable", "--now", self._service.value)
+        _systemctl("enable", "--now", self._service.value, capture=False)
 
     def disable(self) -> None:
         """Disable service."""
-        _systemctl("disable", "--now", self._service.value)
+        _systemctl("disable", "--now", self._service.value, capture=False)
 
     def restart(self) -> None:
         """Restart service."""
-        _systemctl("reload-or-restart", self._service.value)
+        _systemctl("reload-or-restart", self._service.value, capture=False)
 
     def active(self) -> bool:
         """Return True if the service is active."""
-        return (
-            _call("systemctl", "is-active", "--quiet", self._service.value, check=False).returncode
-            == 0
+        result = _call(
+            "systemctl", "is-active", "--quiet", self._service.value, check=False, capture=False
         )
+        return result.returncode == 0
 
 
 class _SnapServiceManager(_ServiceManager):
     """Control a Slurm service."""
 
+    def __init__(self, service: _ServiceType, ops_manager: "_SnapManager") -> None:
+        super().__init__(service)
+        self._ops_manager = ops_manager
+
     def enable(self) -> None:
         """Enable service."""
-        _snap("start", "--enable", f"slurm.{self._service.value}")
+        self._ops_manager.enable_services(self._service)
 
     def disable(self) -> None:
         """Disable service."""
-        _snap("stop", "--disable", f"slurm.{self._service.value}")
+        self._ops_manager.disable_services(self._service)
 
     def restart(self) -> None:
         """Restart service."""
-        _snap("restart", f"slurm.{self._service.value}")
+        self._ops_manager.restart_services(self._service)
 
     def active(self) -> bool:
         """Return True if the service is active."""
-        info = yaml.safe_load(_snap("info", "slurm"))
-        if (services := info.get("services")) is None:
-            raise SlurmOpsError("unable to retrive snap info. ensure slurm is correctly installed")
+        name = self._service.snap_name
+        if _SNAPD_SOCKET.exists():
+            try:
+                apps = _snapd("/v2/apps", names=name, select="service")
+                return any(app.get("active", False) for app in apps)
+            except _snapd_errors() as e:
+                _logger.debug("failed to query snapd api. falling back to `snap services`: %s", e)
+
+        result = _call("snap", "services", name, check=False)
+        if result.returncode != 0 or result.stdout is None:
+            raise SlurmOpsError(
+                "unable to retrieve snap info. ensure slurm is correctly installed"
+            )
+
+        # Output of `snap services` is a table with the columns `Service Startup Current Notes`.
+        for line in result.stdout.splitlines()[1:]:
+            service, _, current, *_ = line.split()
+            if service == name:
+                return current == "active"
 
-        # Assume `services` contains the service, since `ServiceManager` is not exposed as a
-        # public interface for now.
-        # We don't do `"active" in state` because the word "active" is also part of "inactive" :)
-        return "inactive" not in services[f"slurm.{self._service.value}"]
+        raise SlurmOpsError(f"service {name} not found in slurm snap")
 
 
 class _OpsManager(ABC):
@@ -466,6 +822,11 @@ class _OpsManager(ABC):
     def var_lib_path(self) -> Path:
         """Get the path to the Slurm variable state data directory."""
 
+    @property
+    def munge_key_path(self) -> Path:
+        """Get the path to the munge key file."""
+        return self.etc_path.parent / "munge" / "munge.key"
+
     @abstractmethod
     def service_manager_for(self, service: _ServiceType) -> _ServiceManager:
         """Return the `ServiceManager` for the specified `ServiceType`."""
@@ -474,48 +835,115 @@ class _OpsManager(ABC):
     def env_manager_for(self, service: _ServiceType) -> _EnvManager:
         """Return the `_EnvManager` for the specified `ServiceType`."""
 
+    @abstractmethod
+    def enable_services(self, *services: _ServiceType) -> None:
+        """Enable multiple services with a single command. Does nothing if none are given."""
+
+    @abstractmethod
+    def disable_services(self, *services: _ServiceType) -> None:
+        """Disable multiple services with a single command. Does nothing if none are given."""
+
+    @abstractmethod
+    def restart_services(self, *services: _ServiceType) -> None:
+        """Restart multiple services with a single command. Does nothing if none are given."""
+
 
 class _SnapManager(_OpsManager):
     """Operations manager for the Slurm snap backend."""
 
+    _ETC_PATH = Path("/var/snap/slurm/common/etc/slurm")
+    _VAR_LIB_PATH = Path("/var/snap/slurm/common/var/lib/slurm")
+
     def install(self) -> None:
         """Install Slurm using the `slurm` snap."""
         # TODO: https://github.com/charmed-hpc/hpc-libs/issues/35 -
         #   Pin Slurm snap to stable channel.
-        _snap("install", "slurm", "--channel", "latest/candidate", "--classic")
+        _snap(
+            "install",
+            "slurm",
+            "--channel",
+            "latest/candidate",
+            "--classic",
+            capture=False,
+            timeout=_INSTALL_TIMEOUT,
+        )
         # TODO: https://github.com/charmed-hpc/slurm-snap/issues/49 -
         #   Request automatic alias for the Slurm snap so we don't need to do it here.
         #   We will possibly need to account for a third-party Slurm snap installation
         #   where aliasing is not automatically performed.
-        _snap("alias", "slurm.mungectl", "mungectl")
+        _snap("alias", "slurm.mungectl", "mungectl", capture=False)
 
     def version(self) -> str:
         """Get the current version of the `slurm` snap installed on the system."""
-        info = yaml.safe_load(_snap("info", "slurm"))
-        if (ver := info.get("installed")) is None:
+        if _SNAPD_SOCKET.exists():
+            try:
+                return _snapd("/v2/snaps/slurm")["version"]
+            except _snapd_errors() as e:
+                _logger.debug("failed to query snapd api. falling back to `snap list`: %s", e)
+
+        result = _call("snap", "list", "slurm", check=False)
+        if result.returncode != 0 or result.stdout is None:
             raise SlurmOpsError(
                 "unable to retrieve snap info. ensure slurm is correctly installed"
             )
-        return ver.split(maxsplit=1)[0]
+
+        # Output of `snap list` is a table with the columns `Name Version Rev Tracking ...`.
+        for line in result.stdout.splitlines()[1:]:
+            name, version, *_ = line.split()
+            if name == "slurm":
+                return version
+
+        raise SlurmOpsError("unable to retrieve snap info. ensure slurm is correctly installed")
 
     @property
     def etc_path(self) -> Path:
         """Get the path to the Slurm configuration directory."""
-        return Path("/var/snap/slurm/common/etc/slurm")
+        return self._ETC_PATH
 
     @property
     def var_lib_path(self) -> Path:
         """Get the path to the Slurm variable state data directory."""
-        return Path("/var/snap/slurm/common/var/lib/slurm")
+        return self._VAR_LIB_PATH
 
     def service_manager_for(self, service: _ServiceType) -> _ServiceManager:
         """Return the `ServiceManager` for the specified `ServiceType`."""
-        return _SnapServiceManager(service)
+        return _SnapServiceManager(service, self)
 
     def env_manager_for(self, service: _ServiceType) -> _EnvManager:
         """Return the `_EnvManager` for the specified `ServiceType`."""
         return _EnvManager(file="/var/snap/slurm/common/.env")
 
+    def enable_services(self, *services: _ServiceType) -> None:
+        """Enable multiple services with a single `snap start` command."""
+        if not services:
+            return
+
+        _snap(
+            "start",
+            "--enable",
+            *(service.snap_name for service in services),
+            capture=False,
+        )
+
+    def disable_services(self, *services: _ServiceType) -> None:
+        """Disable multiple services with a single `snap stop` command."""
+        if not services:
+            return
+
+        _snap(
+            "stop",
+            "--disable",
+            *(service.snap_name for service in services),
+            capture=False,
+        )
+
+    def restart_services(self, *services: _ServiceType) -> None:
+        """Restart multiple services with a single `snap restart` command."""
+        if not services:
+            return
+
+        _snap("restart", *(service.snap_name for service in services), capture=False)
+
 
 class _AptManager(_OpsManager):
     """Operations manager for the Slurm Debian package backend.
@@ -526,33 +954,61 @@ class _AptManager(_OpsManager):
         ensure the new command correctly passes the environment variable to the command.
     """
 
+    _ETC_PATH = Path("/etc/slurm")
+    _VAR_LIB_PATH = Path("/var/lib/slurm")
+
     def __init__(self, service: _ServiceType) -> None:
+        # Fail early if the `apt` charm library has not been fetched.
+        _require_apt()
         self._service_name = service.value
         self._env_file = Path(f"/etc/default/{self._service_name}")
+        self._version: Optional[str] = None
 
     def install(self) -> None:
         """Install Slurm using the `slurm-wlm` Debian package set."""
+        self._version = None
         self._init_ubuntu_hpc_ppa()
         self._install_service()
         self._create_state_save_location()
         self._apply_overrides()
 
     def version(self) -> str:
-        """Get the current version of Slurm installed on the system."""
-        try:
-            return apt.DebianPackage.from_installed_package(self._service_name).version.number
-        except apt.PackageNotFoundError as e:
-            raise SlurmOpsError(f"unable to retrieve {self._service_name} version. reason: {e}")
+        """Get the current version of Slurm installed on the system.
+
+        The version is cached once retrieved. The cache is cleared by `install`.
+        """
+        if self._version is not None:
+            return self._version
+
+        # Query the single package with `dpkg-query` rather than loading the whole apt cache.
+        result = _call(
+            "dpkg-query",
+            "--show",
+            "--showformat=${db:Status-Status} ${Version}",
+            self._service_name,
+            check=False,
+            # A missing package is reported by the `SlurmOpsError` raised below.
+            log_errors=False,
+        )
+        status, _, version = (result.stdout or "").partition(" ")
+        if result.returncode != 0 or status != "installed":
+            raise SlurmOpsError(
+                f"unable to retrieve {self._service_name} version. reason: {result.stderr}"
+            )
+
+        # Drop the epoch, if any, to match the version number reported by `apt`.
+        self._version = _EPOCH.sub("", version, count=1)
+        return self._version
 
     @property
     def etc_path(self) -> Path:
         """Get the path to the Slurm configuration directory."""
-        return Path("/etc/slurm")
+        return self._ETC_PATH
 
     @property
     def var_lib_path(self) -> Path:
         """Get the path to the Slurm variable state data directory."""
-        return Path("/var/lib/slurm")
+        return self._VAR_LIB_PATH
 
     def service_manager_for(self, service: _ServiceType) -> _ServiceManager:
         """Return the `ServiceManager` for the specified `ServiceType`."""
@@ -562,58 +1018,59 @@ class _AptManager(_OpsManager):
         """Return the `_EnvManager` for the specified `ServiceType`."""
         return _EnvManager(file=f"/etc/default/{service.value}")
 
+    def enable_services(self, *services: _ServiceType) -> None:
+        """Enable multiple services with a single `systemctl enable` command."""
+        if not services:
+            return
+
+        _systemctl("enable", "--now", *(service.value for service in services), capture=False)
+
+    def disable_services(self, *services: _ServiceType) -> None:
+        """Disable multiple services with a single `systemctl disable` command."""
+        if not services:
+            return
+
+        _systemctl("disable", "--now", *(service.value for service in services), capture=False)
+
+    def restart_services(self, *services: _ServiceType) -> None:
+        """Restart multiple services with a single `systemctl reload-or-restart` command."""
+        if not services:
+            return
+
+        _systemctl("reload-or-restart", *(service.value for service in services), capture=False)
+
     @staticmethod
     def _init_ubuntu_hpc_ppa() -> None:
         """Initialize `apt` to use Ubuntu HPC Debian package repositories.
 
+        Importing the repository key and updating the package index are skipped if
+        the repositories are already configured.
+
         Raises:
             SlurmOpsError: Raised if `apt` fails to update with Ubuntu HPC repositories enabled.
         """
+        import distro
+
+        apt = _require_apt()
+        uri = "https://ppa.launchpadcontent.net/ubuntu-hpc/experimental/ubuntu"
+        release = distro.codename()
+        repositories = apt.RepositoryMapping()
+        if any(
+            repo.enabled and repo.repotype == "deb" and repo.uri == uri and repo.release == release
+            for repo in repositories
+        ):
+            _logger.debug("ubuntu hpc debian package repositories are already initialized")
+            return
+
         _logger.debug("initializing apt to use ubuntu hpc debian package repositories")
         experimental = apt.DebianRepository(
             enabled=True,
             repotype="deb",
-            uri="https://ppa.launchpadcontent.net/ubuntu-hpc/experimental/ubuntu",
-            release=distro.codename(),
+            uri=uri,
+            release=release,
             groups=["main"],
         )
-        experimental.import_key(
-            textwrap.dedent(
-                """
-                -----BEGIN PGP PUBLIC KEY BLOCK-----
-                Comment: Hostname:
-                Version: Hockeypuck 2.2
-
-                xsFNBGTuZb8BEACtJ1CnZe6/hv84DceHv+a54y3Pqq0gqED0xhTKnbj/E2ByJpmT
-                NlDNkpeITwPAAN1e3824Me76Qn31RkogTMoPJ2o2XfG253RXd67MPxYhfKTJcnM3
-                CEkmeI4u2Lynh3O6RQ08nAFS2AGTeFVFH2GPNWrfOsGZW03Jas85TZ0k7LXVHiBs
-                W6qonbsFJhshvwC3SryG4XYT+z/+35x5fus4rPtMrrEOD65hij7EtQNaE8owuAju
-                Kcd0m2b+crMXNcllWFWmYMV0VjksQvYD7jwGrWeKs+EeHgU8ZuqaIP4pYHvoQjag
-                umqnH9Qsaq5NAXiuAIAGDIIV4RdAfQIR4opGaVgIFJdvoSwYe3oh2JlrLPBlyxyY
-                dayDifd3X8jxq6/oAuyH1h5K/QLs46jLSR8fUbG98SCHlRmvozTuWGk+e07ALtGe
-                sGv78ToHKwoM2buXaTTHMwYwu7Rx8LZ4bZPHdersN1VW/m9yn1n5hMzwbFKy2s6/
-                D4Q2ZBsqlN+5aW2q0IUmO+m0GhcdaDv8U7RVto1cWWPr50HhiCi7Yvei1qZiD9jq
-                57oYZVqTUNCTPxi6NeTOdEc+YqNynWNArx4PHh38LT0bqKtlZCGHNfoAJLPVYhbB
-                b2AHj9edYtHU9AAFSIy+HstET6P0UDxy02IeyE2yxoUBqdlXyv6FL44E+wARAQAB
-                zRxMYXVuY2hwYWQgUFBBIGZvciBVYnVudHUgSFBDwsGOBBMBCgA4FiEErocSHcPk
-                oLD4H/Aj9tDF1ca+s3sFAmTuZb8CGwMFCwkIBwIGFQoJCAsCBBYCAwECHgECF4AA
-                CgkQ9tDF1ca+s3sz3w//RNawsgydrutcbKf0yphDhzWS53wgfrs2KF1KgB0u/H+u
-                6Kn2C6jrVM0vuY4NKpbEPCduOj21pTCepL6PoCLv++tICOLVok5wY7Zn3WQFq0js
-                Iy1wO5t3kA1cTD/05v/qQVBGZ2j4DsJo33iMcQS5AjHvSr0nu7XSvDDEE3cQE55D
-                87vL7lgGjuTOikPh5FpCoS1gpemBfwm2Lbm4P8vGOA4/witRjGgfC1fv1idUnZLM
-                TbGrDlhVie8pX2kgB6yTYbJ3P3kpC1ZPpXSRWO/cQ8xoYpLBTXOOtqwZZUnxyzHh
-                gM+hv42vPTOnCo+apD97/VArsp59pDqEVoAtMTk72fdBqR+BB77g2hBkKESgQIEq
-                EiE1/TOISioMkE0AuUdaJ2ebyQXugSHHuBaqbEC47v8t5DVN5Qr9OriuzCuSDNFn
-                6SBHpahN9ZNi9w0A/Yh1+lFfpkVw2t04Q2LNuupqOpW+h3/62AeUqjUIAIrmfeML
-                IDRE2VdquYdIXKuhNvfpJYGdyvx/wAbiAeBWg0uPSepwTfTG59VPQmj0FtalkMnN
-                ya2212K5q68O5eXOfCnGeMvqIXxqzpdukxSZnLkgk40uFJnJVESd/CxHquqHPUDE
-                fy6i2AnB3kUI27D4HY2YSlXLSRbjiSxTfVwNCzDsIh7Czefsm6ITK2+cVWs0hNQ=
-                =cs1s
-                -----END PGP PUBLIC KEY BLOCK-----
-                """
-            )
-        )
-        repositories = apt.RepositoryMapping()
+        experimental.import_key(_UBUNTU_HPC_PPA_KEY)
         repositories.add(experimental)
 
         try:
@@ -627,18 +1084,8 @@ class _AptManager(_OpsManager):
     def _set_ulimit() -> None:
         """Set `ulimit` on nodes that need to be able to open many files at once."""
         ulimit_config_file = Path("/etc/security/limits.d/20-charmed-hpc-openfile.conf")
-        ulimit_config = textwrap.dedent(
-            """
-            * soft nofile  1048576
-            * hard nofile  1048576
-            * soft memlock unlimited
-            * hard memlock unlimited
-            * soft stack unlimited
-            * hard stack unlimited
-            """
-        )
-        _logger.debug("setting ulimit configuration for node to:\n%s", ulimit_config)
-        ulimit_config_file.write_text(ulimit_config)
+        _logger.debug("setting ulimit configuration for node to:\n%s", _ULIMIT_CONFIG)
+        _write_if_changed(ulimit_config_file, _ULIMIT_CONFIG)
         ulimit_config_file.chmod(0o644)
 
     def _install_service(self) -> None:
@@ -663,7 +1110,24 @@ class _AptManager(_OpsManager):
                     self._service_name,
                 )
 
+        # Check every package with a single `dpkg-query` call so that `apt` is only
+        # consulted if something actually needs to be installed.
+        result = _call(
+            "dpkg-query",
+            "--show",
+            "--showformat=${db:Status-Status}\\n",
+            *packages,
+            check=False,
+            # Packages are expected to be missing on a fresh node.
+            log_errors=False,
+        )
+        if result.returncode == 0 and result.stdout is not None:
+            if result.stdout.split() == ["installed"] * len(packages):
+                _logger.debug("packages %s are already installed", packages)
+                return
+
         _logger.debug("installing packages %s with apt", packages)
+        apt = _require_apt()
         try:
             apt.add_package(packages)
         except (apt.PackageNotFoundError, apt.PackageError) as e:
@@ -686,7 +1150,12 @@ class _AptManager(_OpsManager):
         shutil.chown(target, "slurm", "slurm")
 
     def _apply_overrides(self) -> None:
-        """Override defaults supplied provided by Slurm Debian packages."""
+        """Override defaults supplied provided by Slurm Debian packages.
+
+        systemd is reloaded directly if any of the service's unit files were changed,
+        otherwise only if systemd reports that the service's units need a reload.
+        """
+        changed = False
         match self._service_name:
             case "sackd":
                 _logger.debug("overriding default sackd service configuration")
@@ -694,15 +1163,7 @@ class _AptManager(_OpsManager):
                     "/etc/systemd/system/sackd.service.d/10-sackd-config-server.conf"
                 )
                 config_override.parent.mkdir(parents=True, exist_ok=True)
-                config_override.write_text(
-                    textwrap.dedent(
-                        """
-                        [Service]
-                        ExecStart=
-                        ExecStart=/usr/sbin/sackd --systemd --conf-server $SACKD_CONFIG_SERVER
-                        """
-                    )
-                )
+                changed |= _write_if_changed(config_override, _SACKD_CONFIG_SERVER_OVERRIDE)
 
                 # TODO: https://github.com/charmed-hpc/hpc-libs/issues/54 -
                 #   Make `sackd` create its service environment file so that we
@@ -717,15 +1178,7 @@ class _AptManager(_OpsManager):
                     "/etc/systemd/system/slurmctld.service.d/10-slurmctld-nofile.conf"
                 )
                 nofile_override.parent.mkdir(exist_ok=True, parents=True)
-                nofile_override.write_text(
-                    textwrap.dedent(
-                        """
-                        [Service]
-                        LimitMEMLOCK=infinity
-                        LimitNOFILE=1048576
-                        """
-                    )
-                )
+                changed |= _write_if_changed(nofile_override, _NOFILE_OVERRIDE)
             case "slurmd":
                 _logger.debug("overriding default slurmd service configuration")
                 self._set_ulimit()
@@ -734,35 +1187,21 @@ class _AptManager(_OpsManager):
                     "/etc/systemd/system/slurmctld.service.d/10-slurmd-nofile.conf"
                 )
                 nofile_override.parent.mkdir(exist_ok=True, parents=True)
-                nofile_override.write_text(
-                    textwrap.dedent(
-                        """
-                        [Service]
-                        LimitMEMLOCK=infinity
-                        LimitNOFILE=1048576
-                        """
-                    )
-                )
+                changed |= _write_if_changed(nofile_override, _NOFILE_OVERRIDE)
 
                 config_override = Path(
                     "/etc/systemd/system/slurmd.service.d/20-slurmd-config-server.conf"
                 )
                 config_override.parent.mkdir(exist_ok=True, parents=True)
-                config_override.write_text(
-                    textwrap.dedent(
-                        """
-                        [Service]
-                        ExecStart=
-                        ExecStart=/usr/bin/sh -c "/usr/sbin/slurmd -D -s $${SLURMD_CONFIG_SERVER:+--conf-server $$SLURMD_CONFIG_SERVER} $$SLURMD_OPTIONS"
-                        """
-                    )
-                )
+                changed |= _write_if_changed(config_override, _SLURMD_CONFIG_SERVER_OVERRIDE)
             case "slurmrestd":
                 # TODO: https://github.com/charmed-hpc/hpc-libs/issues/39 -
                 #   Make `slurmrestd` package preinst hook create the system user and group
                 #   so that we do not need to do it manually here.
                 _logger.debug("creating slurmrestd user and group")
-                result = _call("groupadd", "--gid", "64031", "slurmrestd", check=False)
+                result = _call(
+                    "groupadd", "--gid", "64031", "slurmrestd", check=False, capture=False
+                )
                 if result.returncode == 9:
                     _logger.debug("group 'slurmrestd' already exists")
                 elif result.returncode != 0:
@@ -779,6 +1218,7 @@ class _AptManager(_OpsManager):
                     "/nonexistent",
                     "slurmrestd",
                     check=False,
+                    capture=False,
                 )
                 if result.returncode == 9:
                     _logger.debug("user 'slurmrestd' already exists")
@@ -793,37 +1233,32 @@ class _AptManager(_OpsManager):
 
                 _logger.debug("overriding default slurmrestd service configuration")
                 config_override = Path("/usr/lib/systemd/system/slurmrestd.service")
-                config_override.write_text(
-                    textwrap.dedent(
-                        """
-                        [Unit]
-                        Description=Slurm REST daemon
-                        After=network.target munge.service slurmctld.service
-                        ConditionPathExists=/etc/slurm/slurm.conf
-                        Documentation=man:slurmrestd(8)
-
-                        [Service]
-                        Type=simple
-                        EnvironmentFile=-/etc/default/slurmrestd
-                        Environment="SLURM_JWT=daemon"
-                        ExecStart=/usr/sbin/slurmrestd $SLURMRESTD_OPTIONS -vv 0.0.0.0:6820
-                        ExecReload=/bin/kill -HUP $MAINPID
-                        User=slurmrestd
-                        Group=slurmrestd
-
-                        # Restart service if failed
-                        Restart=on-failure
-                        RestartSec=30s
-
-                        [Install]
-                        WantedBy=multi-user.target
-                        """
-                    )
-                )
+                changed |= _write_if_changed(config_override, _SLURMRESTD_SERVICE)
             case _:
                 _logger.debug("'%s' does not require any overrides", self._service_name)
 
-        _systemctl("daemon-reload")
+        if changed:
+            _systemctl("daemon-reload", capture=False)
+        else:
+            # An earlier hook may have written the overrides but failed before reloading.
+            self._daemon_reload(self._service_name)
+
+    @staticmethod
+    def _daemon_reload(*units: str) -> None:
+        """Reload systemd's manager configuration if any of `units` have changed on disk.
+
+        `systemctl daemon-reload` reruns every generator and reloads every unit on the
+        system, so it is skipped if systemd reports that none of `units` need a reload.
+        """
+        result = _call(
+            "systemctl", "show", "--property=NeedDaemonReload", "--value", *units, check=False
+        )
+        if result.returncode == 0 and result.stdout is not None:
+            if all(line == "no" for line in result.stdout.split()):
+                _logger.debug("units %s are up to date. skipping daemon-reload", units)
+                return
+
+        _systemctl("daemon-reload", capture=False)
 
 
 # TODO: https://github.com/charmed-hpc/hpc-libs/issues/36 -
@@ -852,6 +1287,9 @@ class _JWTKeyManager:
 
     def generate(self) -> None:
         """Generate a new, cryptographically secure jwt key."""
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
         key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
         self.set(
             key.private_bytes(
@@ -865,30 +1303,53 @@ class _JWTKeyManager:
 # TODO: https://github.com/charmed-hpc/mungectl/issues/5 -
 #   Have `mungectl` set user and group permissions on the munge.key file.
 class _MungeKeyManager:
-    """Control the munge key via `mungectl ...` commands."""
+    """Control the munge key.
 
-    @staticmethod
-    def get() -> str:
+    The munge key file is read and written directly if it exists. Otherwise,
+    the munge key is controlled via `mungectl ...` commands.
+    """
+
+    def __init__(self, keyfile: Path) -> None:
+        self._keyfile = keyfile
+
+    def get(self) -> str:
         """Get the current munge key.
 
         Returns:
             The current munge key as a base64-encoded string.
         """
-        return _mungectl("key", "get")
+        try:
+            return base64.b64encode(self._keyfile.read_bytes()).decode()
+        except OSError:
+            return _mungectl("key", "get")
 
-    @staticmethod
-    def set(key: str) -> None:
+    def set(self, key: str) -> None:
         """Set a new munge key.
 
         Args:
             key: A new, base64-encoded munge key.
+
+        Raises:
+            SlurmOpsError: Raised if `key` is not valid base64.
         """
-        _mungectl("key", "set", stdin=key)
+        if not self._keyfile.exists():
+            _mungectl("key", "set", stdin=key, capture=False)
+            return
 
-    @staticmethod
-    def generate() -> None:
+        try:
+            content = base64.b64decode(key, validate=True)
+        except binascii.Error as e:
+            raise SlurmOpsError(f"munge key is not valid base64. reason: {e}")
+
+        _write_atomic(self._keyfile, content, mode=0o600)
+
+    def generate(self) -> None:
         """Generate a new, cryptographically secure munge key."""
-        _mungectl("key", "generate")
+        if not self._keyfile.exists():
+            _mungectl("key", "generate", capture=False)
+            return
+
+        _write_atomic(self._keyfile, os.urandom(1024), mode=0o600)
 
 
 class _MungeManager:
@@ -896,7 +1357,7 @@ class _MungeManager:
 
     def __init__(self, ops_manager: _OpsManager) -> None:
         self.service = ops_manager.service_manager_for(_ServiceType.MUNGE)
-        self.key = _MungeKeyManager()
+        self.key = _MungeKeyManager(ops_manager.munge_key_path)
 
 
 class _PrometheusExporterManager:
@@ -912,12 +1373,24 @@ class _SlurmManagerBase:
     def __init__(self, service: _ServiceType, snap: bool = False) -> None:
         self._ops_manager = _SnapManager() if snap else _AptManager(service)
         self.service = self._ops_manager.service_manager_for(service)
-        self.munge = _MungeManager(self._ops_manager)
-        self.jwt = _JWTKeyManager(self._ops_manager, self.user, self.group)
-        self.exporter = _PrometheusExporterManager(self._ops_manager)
         self.install = self._ops_manager.install
         self.version = self._ops_manager.version
 
+    @functools.cached_property
+    def munge(self) -> _MungeManager:
+        """Manager for the `munged` service used by this Slurm service."""
+        return _MungeManager(self._ops_manager)
+
+    @functools.cached_property
+    def jwt(self) -> _JWTKeyManager:
+        """Manager for the JWT key used by this Slurm service."""
+        return _JWTKeyManager(self._ops_manager, self.user, self.group)
+
+    @functools.cached_property
+    def exporter(self) -> _PrometheusExporterManager:
+        """Manager for the `prometheus-slurm-exporter` service."""
+        return _PrometheusExporterManager(self._ops_manager)
+
     @property
     def user(self) -> str:
         """Get the user that managed service is running as."""
@@ -928,10 +1401,25 @@ class _SlurmManagerBase:
         """Get the group that the managed service is running as."""
         return "slurm"
 
-    @property
+    @functools.cached_property
     def hostname(self) -> str:
         """The hostname where this manager is running."""
-        return socket.gethostname().split(".")[0]
+        return socket.gethostname().partition(".")[0]
+
+    def enable_services(self, *services: _ServiceManager) -> None:
+        """Enable multiple services in a single operation.
+
+        Args:
+            *services: Services to enable, e.g. `self.munge.service` and `self.service`.
+
+        Notes:
+            All services are handed to snapd or systemd in one request so that they are
+            started together rather than waiting on each service one at a time.
+        """
+        if not services:
+            return
+
+        self._ops_manager.enable_services(*(service.type for service in services))
 
     @staticmethod
     def scontrol(*args) -> str:
@@ -974,19 +1462,42 @@ class SlurmctldManager(_SlurmManagerBase):
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(service=_ServiceType.SLURMCTLD, *args, **kwargs)
-        self.config = _SlurmConfigManager(
-            self._ops_manager.etc_path / "slurm.conf", self.user, self.group
+        etc_path = self._ops_manager.etc_path
+        self.config: _ConfigManager["SlurmConfig"] = _ConfigManager(
+            etc_path / "slurm.conf", self.user, self.group, editor="slurmconfig", mode=0o644
         )
-        self.acct_gather = _AcctGatherConfigManager(
-            self._ops_manager.etc_path / "acct_gather.conf", self.user, self.group
+        self.acct_gather: _ConfigManager["AcctGatherConfig"] = _ConfigManager(
+            etc_path / "acct_gather.conf",
+            self.user,
+            self.group,
+            editor="acctgatherconfig",
+            mode=0o600,
         )
-        self.cgroup = _CgroupConfigManager(
-            self._ops_manager.etc_path / "cgroup.conf", self.user, self.group
+        self.cgroup: _ConfigManager["CgroupConfig"] = _ConfigManager(
+            etc_path / "cgroup.conf", self.user, self.group, editor="cgroupconfig", mode=0o644
         )
-        self.gres = _GRESConfigManager(
-            self._ops_manager.etc_path / "gres.conf", self.user, self.group
+        self.gres: _ConfigManager["GRESConfig"] = _ConfigManager(
+            etc_path / "gres.conf", self.user, self.group, editor="gresconfig", mode=0o644
         )
 
+    @contextmanager
+    def edit_all(self) -> tuple["SlurmConfig", "CgroupConfig"]:
+        """Edit the current `slurm.conf` and `cgroup.conf` configuration files together.
+
+        Both configurations are serialised once the edits to both are complete, and
+        neither file is written if editing or serialising either fails. `slurm.conf` is
+        then written before `cgroup.conf`, so if writing `cgroup.conf` fails the node is
+        left with the new `slurm.conf` and the old `cgroup.conf`.
+        """
+        slurm_current, slurm = self.config._open()
+        cgroup_current, cgroup = self.cgroup._open()
+        yield slurm, cgroup
+
+        slurm_new = self.config._editor.dumps(slurm)
+        cgroup_new = self.cgroup._editor.dumps(cgroup)
+        self.config._save(slurm_current, slurm_new)
+        self.cgroup._save(cgroup_current, cgroup_new)
+
 
 class SlurmdManager(_SlurmManagerBase):
     """Manager for the `slurmd` service."""
@@ -1030,8 +1541,12 @@ class SlurmdbdManager(_SlurmManagerBase):
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(service=_ServiceType.SLURMDBD, *args, **kwargs)
         self._env_manager = self._ops_manager.env_manager_for(_ServiceType.SLURMDBD)
-        self.config = _SlurmdbdConfigManager(
-            self._ops_manager.etc_path / "slurmdbd.conf", self.user, self.group
+        self.config: _ConfigManager["SlurmdbdConfig"] = _ConfigManager(
+            self._ops_manager.etc_path / "slurmdbd.conf",
+            self.user,
+            self.group,
+            editor="slurmdbdconfig",
+            mode=0o600,
         )
 
     @property
@@ -1055,8 +1570,12 @@ class SlurmrestdManager(_SlurmManagerBase):
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(service=_ServiceType.SLURMRESTD, *args, **kwargs)
-        self.config = _SlurmConfigManager(
-            self._ops_manager.etc_path / "slurm.conf", user=self.user, group=self.group
+        self.config: _ConfigManager["SlurmConfig"] = _ConfigManager(
+            self._ops_manager.etc_path / "slurm.conf",
+            user=self.user,
+            group=self.group,
+            editor="slurmconfig",
+            mode=0o644,
         )
 
     @property
@@ -17,8 +17,9 @@ from charms.hpc_libs.v0.slurm_ops import (
     SlurmdManager,
     SlurmOpsError,
     SlurmrestdManager,
+    _ServiceType,
 )
-from constants import APT_SLURM_INFO, ULIMIT_CONFIG
+from constants import ULIMIT_CONFIG
 from pyfakefs.fake_filesystem_unittest import TestCase
 
 
@@ -46,21 +47,47 @@ class TestAptPackageManager(TestCase):
 
     def test_version(self, subcmd) -> None:
         """Test that `version` gets the correct package version number."""
-        subcmd.side_effect = [
-            subprocess.CompletedProcess([], returncode=0, stdout="amd64"),
-            subprocess.CompletedProcess([], returncode=0, stdout=APT_SLURM_INFO),
-        ]
+        subcmd.return_value = subprocess.CompletedProcess(
+            [], returncode=0, stdout=b"installed 23.11.7-2ubuntu1"
+        )
         version = self.slurmctld.version()
         args = subcmd.call_args[0][0]
         self.assertEqual(version, "23.11.7-2ubuntu1")
-        self.assertListEqual(args, ["dpkg", "-l", "slurmctld"])
+        self.assertListEqual(
+            args,
+            [
+                "dpkg-query",
+                "--show",
+                "--showformat=${db:Status-Status} ${Version}",
+                "slurmctld",
+            ],
+        )
+
+        # The version is cached after the first call.
+        self.assertEqual(self.slurmctld.version(), "23.11.7-2ubuntu1")
+        subcmd.assert_called_once()
+
+        # Only the epoch is dropped from versions that contain colons.
+        self.slurmctld._ops_manager._version = None
+        subcmd.return_value = subprocess.CompletedProcess(
+            [], returncode=0, stdout=b"installed 1:2.3:4-1"
+        )
+        self.assertEqual(self.slurmctld.version(), "2.3:4-1")
 
     def test_version_not_installed(self, subcmd) -> None:
         """Test that `version` throws an error if Slurm service is not installed."""
-        subcmd.side_effect = [
-            subprocess.CompletedProcess([], returncode=0, stdout="amd64"),
-            subprocess.CompletedProcess([], returncode=1),
-        ]
+        subcmd.return_value = subprocess.CompletedProcess(
+            [], returncode=1, stderr=b"dpkg-query: no packages found matching slurmctld"
+        )
+        with (
+            self.assertNoLogs("charms.hpc_libs.v0.slurm_ops", level="ERROR"),
+            self.assertRaises(SlurmOpsError),
+        ):
+            self.slurmctld.version()
+
+        subcmd.return_value = subprocess.CompletedProcess(
+            [], returncode=0, stdout=b"config-files 23.11.7-2ubuntu1"
+        )
         with self.assertRaises(SlurmOpsError):
             self.slurmctld.version()
 
@@ -73,6 +100,23 @@ class TestAptPackageManager(TestCase):
         """Test that Ubuntu HPC repositories are initialized correctly."""
         self.slurmctld._ops_manager._init_ubuntu_hpc_ppa()
 
+    @patch("charms.operator_libs_linux.v0.apt.update")
+    @patch("charms.operator_libs_linux.v0.apt.DebianRepository.import_key")
+    @patch("charms.operator_libs_linux.v0.apt.RepositoryMapping.add")
+    @patch("distro.codename", return_value="noble")
+    def test_init_ubuntu_hpc_ppa_already_initialized(
+        self, _, add, import_key, update, *__
+    ) -> None:
+        """Test that Ubuntu HPC repositories are not initialized again if already present."""
+        self.fs.create_file(
+            "/etc/apt/sources.list.d/ubuntu-hpc-experimental.list",
+            contents="deb https://ppa.launchpadcontent.net/ubuntu-hpc/experimental/ubuntu noble main\n",
+        )
+        self.slurmctld._ops_manager._init_ubuntu_hpc_ppa()
+        import_key.assert_not_called()
+        add.assert_not_called()
+        update.assert_not_called()
+
     @patch("charms.operator_libs_linux.v0.apt.DebianRepository._get_keyid_by_gpg_key")
     @patch("charms.operator_libs_linux.v0.apt.DebianRepository._dearmor_gpg_key")
     @patch("charms.operator_libs_linux.v0.apt.DebianRepository._write_apt_gpg_keyfile")
@@ -156,6 +200,51 @@ class TestAptPackageManager(TestCase):
         with self.assertRaises(SlurmOpsError):
             self.slurmctld._ops_manager._install_service()
 
+    @patch("charms.operator_libs_linux.v0.apt.add_package")
+    def test_install_service_already_installed(self, add_package, subcmd) -> None:
+        """Test that `_install_service` skips `apt` if every package is already installed."""
+        subcmd.return_value = subprocess.CompletedProcess(
+            [], returncode=0, stdout=b"installed\ninstalled\ninstalled\ninstalled\n"
+        )
+        self.sackd._ops_manager._install_service()
+        self.assertEqual(subcmd.call_args[0][0][:2], ["dpkg-query", "--show"])
+        self.assertEqual(
+            subcmd.call_args[0][0][3:], ["sackd", "munge", "mungectl", "slurm-client"]
+        )
+        add_package.assert_not_called()
+
+        # `apt` is used if any package is missing.
+        subcmd.return_value = subprocess.CompletedProcess(
+            [], returncode=1, stdout=b"installed\ninstalled\ninstalled\n"
+        )
+        with self.assertNoLogs("charms.hpc_libs.v0.slurm_ops", level="ERROR"):
+            self.sackd._ops_manager._install_service()
+        add_package.assert_called_once()
+
+    def test_service_batch_operations_empty(self, subcmd) -> None:
+        """Test that `_AptManager` does not run a command if no services are given."""
+        self.slurmctld._ops_manager.enable_services()
+        self.slurmctld._ops_manager.disable_services()
+        self.slurmctld._ops_manager.restart_services()
+        subcmd.assert_not_called()
+
+    def test_service_batch_operations(self, subcmd) -> None:
+        """Test that `_AptManager` controls multiple services with a single command."""
+        services = (_ServiceType.MUNGE, _ServiceType.SLURMCTLD)
+        self.slurmctld._ops_manager.enable_services(*services)
+        self.assertListEqual(
+            subcmd.call_args[0][0], ["systemctl", "enable", "--now", "munge", "slurmctld"]
+        )
+        self.slurmctld._ops_manager.disable_services(*services)
+        self.assertListEqual(
+            subcmd.call_args[0][0], ["systemctl", "disable", "--now", "munge", "slurmctld"]
+        )
+        self.slurmctld._ops_manager.restart_services(*services)
+        self.assertListEqual(
+            subcmd.call_args[0][0], ["systemctl", "reload-or-restart", "munge", "slurmctld"]
+        )
+        self.assertEqual(subcmd.call_args[1]["stdout"], subprocess.DEVNULL)
+
     def test_apply_overrides(self, subcmd) -> None:
         """Test that the correct overrides are applied based on the Slurm service installed."""
         # Test overrides for slurmrestd first since it's easier to work with `call_args_list`
@@ -179,6 +268,7 @@ class TestAptPackageManager(TestCase):
             ],
         )
         self.assertListEqual(systemctl, ["systemctl", "daemon-reload"])
+        self.assertEqual(subcmd.call_count, 3)
 
         self.slurmctld._ops_manager._apply_overrides()
         args = subcmd.call_args[0][0]
@@ -190,6 +280,20 @@ class TestAptPackageManager(TestCase):
         self.slurmdbd._ops_manager._apply_overrides()
         self.assertListEqual(args, ["systemctl", "daemon-reload"])
 
+        # Unchanged overrides are not rewritten, and `daemon-reload` is skipped
+        # if systemd reports that the unit is up to date.
+        subcmd.reset_mock()
+        subcmd.return_value = subprocess.CompletedProcess([], returncode=0, stdout=b"no\n")
+        override = Path("/etc/systemd/system/slurmd.service.d/20-slurmd-config-server.conf")
+        mtime = override.stat().st_mtime_ns
+        self.slurmd._ops_manager._apply_overrides()
+        self.assertEqual(override.stat().st_mtime_ns, mtime)
+        subcmd.assert_called_once()
+        self.assertListEqual(
+            subcmd.call_args[0][0],
+            ["systemctl", "show", "--property=NeedDaemonReload", "--value", "slurmd"],
+        )
+
     @patch("charms.hpc_libs.v0.slurm_ops._AptManager._init_ubuntu_hpc_ppa")
     @patch("charms.hpc_libs.v0.slurm_ops._AptManager._install_service")
     @patch("charms.hpc_libs.v0.slurm_ops._AptManager._apply_overrides")
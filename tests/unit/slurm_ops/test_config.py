@@ -4,15 +4,18 @@
 
 """Unit tests for Slurm configuration managers and descriptors."""
 
+import os
 import stat
 from pathlib import Path
+from unittest.mock import patch
 
-import dotenv
 from charms.hpc_libs.v0.slurm_ops import (
     SackdManager,
     SlurmctldManager,
     SlurmdbdManager,
     SlurmdManager,
+    SlurmOpsError,
+    _EnvManager,
 )
 from constants import (
     EXAMPLE_ACCT_GATHER_CONFIG,
@@ -46,10 +49,99 @@ class TestConfigManagement(TestCase):
 
         self.sackd.config_server = "localhost"
         self.assertEqual(self.sackd.config_server, "localhost")
-        self.assertEqual(dotenv.get_key("/etc/default/sackd", "SACKD_CONFIG_SERVER"), "localhost")
+        self.assertEqual(_EnvManager("/etc/default/sackd").get("SACKD_CONFIG_SERVER"), "localhost")
         del self.sackd.config_server
         self.assertIsNone(self.sackd.config_server)
 
+    def test_env_manager_multiple_keys(self) -> None:
+        """Test that `_EnvManager` can set and unset multiple variables at once."""
+        self.fs.create_file("/etc/default/slurmctld")
+        env = _EnvManager("/etc/default/slurmctld")
+
+        env.set({"slurmctld_options": "-vvv", "slurm_conf": "/etc/slurm/slurm.conf"})
+        self.assertEqual(env.get("slurmctld_options"), "-vvv")
+        self.assertEqual(env.get("SLURM_CONF"), "/etc/slurm/slurm.conf")
+
+        env.unset("slurmctld_options", "slurm_conf")
+        self.assertIsNone(env.get("slurmctld_options"))
+        self.assertIsNone(env.get("slurm_conf"))
+
+    def test_env_manager_preserves_file(self) -> None:
+        """Test that `_EnvManager` only rewrites the variables being updated."""
+        self.fs.create_file(
+            "/etc/default/slurmrestd",
+            contents="# Options for slurmrestd.\nSLURMRESTD_OPTIONS=\nMYSQL_UNIX_PORT=/run/mysql.sock",
+            st_mode=stat.S_IFREG | 0o600,
+        )
+        env = _EnvManager("/etc/default/slurmrestd")
+
+        env.set({"mysql_unix_port": "/run/mysqld/mysqld.sock", "slurm_conf": "it's"})
+        self.assertEqual(env.get("mysql_unix_port"), "/run/mysqld/mysqld.sock")
+        self.assertEqual(env.get("slurm_conf"), "it's")
+        self.assertEqual(
+            Path("/etc/default/slurmrestd").read_text(),
+            "# Options for slurmrestd.\n"
+            + "SLURMRESTD_OPTIONS=\n"
+            + 'MYSQL_UNIX_PORT="/run/mysqld/mysqld.sock"\n'
+            + 'SLURM_CONF="it\'s"\n',
+        )
+        # The environment file is replaced atomically, keeping its original permissions.
+        self.assertEqual(stat.S_IMODE(Path("/etc/default/slurmrestd").stat().st_mode), 0o600)
+        self.assertFalse(Path("/etc/default/.slurmrestd.tmp").exists())
+
+        # The environment file is not rewritten if no variables are changed.
+        with patch("charms.hpc_libs.v0.slurm_ops._write_atomic") as write:
+            env.set({"mysql_unix_port": "/run/mysqld/mysqld.sock"})
+            env.unset("slurmd_options")
+        write.assert_not_called()
+
+        # Changes made outside of `_EnvManager` should be picked up.
+        Path("/etc/default/slurmrestd").write_text("SLURMRESTD_OPTIONS=-vvv\n")
+        self.assertEqual(env.get("slurmrestd_options"), "-vvv")
+        self.assertIsNone(env.get("mysql_unix_port"))
+
+        # Replacements by another `_EnvManager` within the same mtime tick are picked up.
+        info = Path("/etc/default/slurmrestd").stat()
+        _EnvManager("/etc/default/slurmrestd").set({"slurmrestd_options": "-v"})
+        os.utime("/etc/default/slurmrestd", ns=(info.st_atime_ns, info.st_mtime_ns))
+        self.assertEqual(env.get("slurmrestd_options"), "-v")
+
+    def test_env_manager_parse(self) -> None:
+        """Test that `_EnvManager` parses the variable syntax found in environment files."""
+        self.fs.create_file(
+            "/etc/default/munge",
+            contents=(
+                "# Options for munged.\n"
+                "export OPTIONS='--key-file=/etc/munge/munge.key --num-threads=24'\n"
+                'LOG_FILE="/var/log/munge/\\"munged\\".log" # Log file.\n'
+                "PID_FILE=/run/munge/munged.pid # Pid file.\n"
+                'QUOTE="it\'s"\n'
+                "SHARE='C:\\share'\n"
+            ),
+        )
+        env = _EnvManager("/etc/default/munge")
+        self.assertEqual(env.get("options"), "--key-file=/etc/munge/munge.key --num-threads=24")
+        self.assertEqual(env.get("log_file"), '/var/log/munge/"munged".log')
+        self.assertEqual(env.get("pid_file"), "/run/munge/munged.pid")
+        self.assertEqual(env.get("quote"), "it's")
+        self.assertEqual(env.get("share"), "C:\\share")
+
+        # Values are written the way systemd's `EnvironmentFile=` and `sh` read them.
+        values = {"a": "x\\'y", "b": "C:\\share", "c": "trailing\\", "d": '$HOME `id` "q"'}
+        env.set(values)
+        for key, value in values.items():
+            self.assertEqual(env.get(key), value)
+        content = Path("/etc/default/munge").read_text().splitlines()
+        self.assertIn('A="x\\\\\'y"', content)
+        self.assertIn('B="C:\\\\share"', content)
+        self.assertIn('C="trailing\\\\"', content)
+        self.assertIn('D="\\$HOME \\`id\\` \\"q\\""', content)
+
+        with self.assertRaises(SlurmOpsError):
+            env.set({"invalid-name": "value"})
+        with self.assertRaises(SlurmOpsError):
+            env.set({"options": "multi\nline"})
+
     def test_slurmctld_manager_acct_gather_config(self) -> None:
         """Test `SlurmctldManager` acct_gather.conf configuration file editor."""
         self.fs.create_file("/etc/slurm/acct_gather.conf", contents=EXAMPLE_ACCT_GATHER_CONFIG)
@@ -197,6 +289,42 @@ class TestConfigManagement(TestCase):
         self.assertEqual(f_info.st_uid, FAKE_USER_UID)
         self.assertEqual(f_info.st_gid, FAKE_GROUP_GID)
 
+        # Ensure that the slurm.conf file is not rewritten if its configuration is unchanged.
+        with patch.object(Path, "write_text") as write_text:
+            with self.slurmctld.config.edit() as config:
+                config.slurmctld_port = "8081"
+
+        write_text.assert_not_called()
+
+    def test_slurmctld_manager_slurm_config_edit_all(self) -> None:
+        """Test that `SlurmctldManager` edits slurm.conf and cgroup.conf together."""
+        # Neither file should be written if editing fails.
+        with self.assertRaises(ValueError):
+            with self.slurmctld.edit_all() as (slurm, cgroup):
+                slurm.slurmctld_port = "8082"
+                cgroup.constrain_cores = "yes"
+                raise ValueError
+
+        self.assertEqual(self.slurmctld.config.load().slurmctld_port, "8081")
+        self.assertEqual(self.slurmctld.cgroup.load().constrain_cores, "no")
+
+        # Neither file should be written if serialising either configuration fails.
+        with patch("slurmutils.editors.slurmconfig.dumps", side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                with self.slurmctld.edit_all() as (slurm, cgroup):
+                    slurm.slurmctld_port = "8082"
+                    cgroup.constrain_cores = "yes"
+
+        self.assertEqual(self.slurmctld.config.load().slurmctld_port, "8081")
+        self.assertEqual(self.slurmctld.cgroup.load().constrain_cores, "no")
+
+        with self.slurmctld.edit_all() as (slurm, cgroup):
+            slurm.slurmctld_port = "8082"
+            cgroup.constrain_cores = "yes"
+
+        self.assertEqual(self.slurmctld.config.load().slurmctld_port, "8082")
+        self.assertEqual(self.slurmctld.cgroup.load().constrain_cores, "yes")
+
     def test_slurmd_config_server(self) -> None:
         """Test `SlurmdManager` `config_server` descriptors."""
         self.fs.create_file("/etc/default/slurmd")
@@ -204,7 +332,7 @@ class TestConfigManagement(TestCase):
         self.slurmd.config_server = "localhost"
         self.assertEqual(self.slurmd.config_server, "localhost")
         self.assertEqual(
-            dotenv.get_key("/etc/default/slurmd", "SLURMD_CONFIG_SERVER"), "localhost"
+            _EnvManager("/etc/default/slurmd").get("SLURMD_CONFIG_SERVER"), "localhost"
         )
 
         del self.slurmd.config_server
@@ -248,7 +376,7 @@ class TestConfigManagement(TestCase):
             "/var/snap/charmed-mysql/common/run/mysqlrouter/mysql.sock",
         )
         self.assertEqual(
-            dotenv.get_key("/etc/default/slurmdbd", "MYSQL_UNIX_PORT"),
+            _EnvManager("/etc/default/slurmdbd").get("MYSQL_UNIX_PORT"),
             "/var/snap/charmed-mysql/common/run/mysqlrouter/mysql.sock",
         )
 
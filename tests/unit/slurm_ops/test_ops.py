@@ -4,10 +4,16 @@
 
 """Unit tests for Slurm service operations managers."""
 
+import base64
+import os
+import stat
 import subprocess
 from pathlib import Path
 from unittest.mock import patch
 
+# `slurm_ops` imports `cryptography` lazily. Import it here so that pyfakefs does not
+# unload and reload it between tests, which breaks `cryptography`'s type checks.
+import cryptography.hazmat.primitives.asymmetric.rsa  # noqa: F401
 from charms.hpc_libs.v0.slurm_ops import (
     SlurmOpsError,
     _ServiceType,
@@ -18,8 +24,8 @@ from constants import (
     FAKE_USER_NAME,
     JWT_KEY,
     MUNGEKEY_BASE64,
-    SNAP_SLURM_INFO,
-    SNAP_SLURM_INFO_NOT_INSTALLED,
+    SNAP_SLURM_NOT_INSTALLED,
+    SNAP_SLURM_SERVICES,
 )
 from pyfakefs.fake_filesystem_unittest import TestCase
 
@@ -73,20 +79,56 @@ class SlurmOpsBase:
         args = subcmd.call_args[0][0]
         self.assertEqual(args, ["snap", "restart", f"slurm.{self.manager.service.type.value}"])
 
+    def test_enable_services(self, subcmd, *_) -> None:
+        """Test that the manager enables multiple services with a single command."""
+        self.manager.enable_services(self.manager.munge.service, self.manager.service)
+
+        args = subcmd.call_args[0][0]
+        self.assertEqual(
+            args,
+            [
+                "snap",
+                "start",
+                "--enable",
+                "slurm.munge",
+                f"slurm.{self.manager.service.type.value}",
+            ],
+        )
+        self.assertEqual(subcmd.call_count, 1)
+
+    def test_enable_services_empty(self, subcmd, *_) -> None:
+        """Test that the manager does not run a command if no services are given."""
+        self.manager.enable_services()
+        subcmd.assert_not_called()
+
     def test_active(self, subcmd) -> None:
         """Test that the manager can detect that a service is active."""
-        subcmd.return_value = subprocess.CompletedProcess([], returncode=0, stdout=SNAP_SLURM_INFO)
+        subcmd.return_value = subprocess.CompletedProcess(
+            [], returncode=0, stdout=SNAP_SLURM_SERVICES.encode()
+        )
         self.assertTrue(self.manager.service.active())
+        args = subcmd.call_args[0][0]
+        self.assertEqual(args, ["snap", "services", f"slurm.{self.manager.service.type.value}"])
+
+    def test_active_inactive(self, subcmd) -> None:
+        """Test that the manager can detect that a service is inactive."""
+        subcmd.return_value = subprocess.CompletedProcess(
+            [],
+            returncode=0,
+            stdout=(
+                "Service Startup Current Notes\n"
+                f"slurm.{self.manager.service.type.value} enabled inactive -"
+            ).encode(),
+        )
+        self.assertFalse(self.manager.service.active())
 
     def test_active_not_installed(self, subcmd, *_) -> None:
         """Test that the manager throws an error when calling `active` if the snap is not installed."""
         subcmd.return_value = subprocess.CompletedProcess(
-            [], returncode=0, stdout=SNAP_SLURM_INFO_NOT_INSTALLED
+            [], returncode=1, stderr=SNAP_SLURM_NOT_INSTALLED.encode()
         )
         with self.assertRaises(SlurmOpsError):
             self.manager.service.active()
-        args = subcmd.call_args[0][0]
-        self.assertEqual(args, ["snap", "info", "slurm"])
 
     def test_generate_munge_key(self, subcmd, *_) -> None:
         """Test that the manager calls the correct `mungectl` command."""
@@ -100,15 +142,47 @@ class SlurmOpsBase:
         args = subcmd.call_args[0][0]
         # MUNGEKEY_BASE64 is piped to `stdin` to avoid exposure.
         self.assertEqual(args, ["mungectl", "key", "set"])
+        self.assertEqual(subcmd.call_args[1]["input"], MUNGEKEY_BASE64.encode())
 
     def test_get_munge_key(self, subcmd, *_) -> None:
         """Test that the manager gets the munge key with the correct command."""
-        subcmd.return_value = subprocess.CompletedProcess([], returncode=0, stdout=MUNGEKEY_BASE64)
+        subcmd.return_value = subprocess.CompletedProcess(
+            [], returncode=0, stdout=MUNGEKEY_BASE64.encode()
+        )
         key = self.manager.munge.key.get()
         args = subcmd.call_args[0][0]
         self.assertEqual(args, ["mungectl", "key", "get"])
         self.assertEqual(key, MUNGEKEY_BASE64)
 
+    def test_munge_key_file(self, subcmd, *_) -> None:
+        """Test that the manager reads and writes an existing munge key file directly."""
+        keyfile = Path("/var/snap/slurm/common/etc/munge/munge.key")
+        self.fs.create_file(keyfile, contents=base64.b64decode(MUNGEKEY_BASE64), st_mode=0o100600)
+
+        self.assertEqual(self.manager.munge.key.get(), MUNGEKEY_BASE64)
+
+        self.manager.munge.key.generate()
+        self.assertNotEqual(self.manager.munge.key.get(), MUNGEKEY_BASE64)
+        self.assertEqual(len(keyfile.read_bytes()), 1024)
+
+        # The key must never be written to a file readable by other users.
+        modes = []
+        with patch(
+            "charms.hpc_libs.v0.slurm_ops.os.fsync",
+            side_effect=lambda fd: modes.append(stat.S_IMODE(os.fstat(fd).st_mode)),
+        ):
+            self.manager.munge.key.set(MUNGEKEY_BASE64)
+        self.assertEqual(modes, [0o600])
+        self.assertEqual(keyfile.read_bytes(), base64.b64decode(MUNGEKEY_BASE64))
+        self.assertEqual(stat.S_IMODE(keyfile.stat().st_mode), 0o600)
+
+        with self.assertRaises(SlurmOpsError):
+            self.manager.munge.key.set("not base64!")
+        with self.assertRaises(SlurmOpsError):
+            self.manager.munge.key.set(MUNGEKEY_BASE64[:-1])
+        self.assertEqual(keyfile.read_bytes(), base64.b64decode(MUNGEKEY_BASE64))
+        subcmd.assert_not_called()
+
     def test_configure_munge(self, *_) -> None:
         """Test that manager is able to correctly configure munge."""
         self.manager.munge.max_thread_count = 24
@@ -131,8 +205,13 @@ class SlurmOpsBase:
     @patch("charms.hpc_libs.v0.slurm_ops.socket.gethostname")
     def test_hostname(self, gethostname, *_) -> None:
         """Test that manager is able to correctly get the host name."""
+        self.manager.__dict__.pop("hostname", None)
         gethostname.return_value = "machine"
         self.assertEqual(self.manager.hostname, "machine")
+        self.assertEqual(self.manager.hostname, "machine")
+        gethostname.assert_called_once()
+
+        del self.manager.hostname
         gethostname.return_value = "machine.domain.com"
         self.assertEqual(self.manager.hostname, "machine")
 
@@ -4,11 +4,19 @@
 
 """Unit tests for `snap` operations manager."""
 
+import http.client
+import json
 import subprocess
 from unittest.mock import patch
 
-from charms.hpc_libs.v0.slurm_ops import SlurmOpsError, _SnapManager
-from constants import SNAP_SLURM_INFO, SNAP_SLURM_INFO_NOT_INSTALLED
+from charms.hpc_libs.v0.slurm_ops import (
+    _DEFAULT_TIMEOUT,
+    SlurmOpsError,
+    _connect_snapd,
+    _ServiceType,
+    _SnapManager,
+)
+from constants import SNAP_SLURM_LIST, SNAP_SLURM_NOT_INSTALLED
 from pyfakefs.fake_filesystem_unittest import TestCase
 
 
@@ -31,24 +39,175 @@ class TestSnapPackageManager(TestCase):
 
     def test_version(self, subcmd) -> None:
         """Test that `slurm_ops` gets the correct version using the correct command."""
-        subcmd.return_value = subprocess.CompletedProcess([], returncode=0, stdout=SNAP_SLURM_INFO)
+        subcmd.return_value = subprocess.CompletedProcess(
+            [], returncode=0, stdout=SNAP_SLURM_LIST.encode()
+        )
         version = self.manager.version()
         args = subcmd.call_args[0][0]
-        self.assertEqual(args, ["snap", "info", "slurm"])
+        self.assertEqual(args, ["snap", "list", "slurm"])
         self.assertEqual(version, "23.11.7")
 
     def test_version_not_installed(self, subcmd) -> None:
         """Test that `slurm_ops` throws when getting the installed version if the slurm snap is not installed."""
         subcmd.return_value = subprocess.CompletedProcess(
-            [], returncode=0, stdout=SNAP_SLURM_INFO_NOT_INSTALLED
+            [], returncode=1, stderr=SNAP_SLURM_NOT_INSTALLED.encode()
         )
         with self.assertRaises(SlurmOpsError):
             self.manager.version()
         args = subcmd.call_args[0][0]
-        self.assertEqual(args, ["snap", "info", "slurm"])
+        self.assertEqual(args, ["snap", "list", "slurm"])
+
+    def test_service_batch_operations(self, subcmd) -> None:
+        """Test that `slurm_ops` controls multiple services with a single command."""
+        services = (_ServiceType.MUNGE, _ServiceType.SLURMCTLD)
+        self.manager.enable_services(*services)
+        self.assertEqual(
+            subcmd.call_args[0][0], ["snap", "start", "--enable", "slurm.munge", "slurm.slurmctld"]
+        )
+        self.manager.disable_services(*services)
+        self.assertEqual(
+            subcmd.call_args[0][0], ["snap", "stop", "--disable", "slurm.munge", "slurm.slurmctld"]
+        )
+        self.manager.restart_services(*services)
+        self.assertEqual(
+            subcmd.call_args[0][0], ["snap", "restart", "slurm.munge", "slurm.slurmctld"]
+        )
+        self.assertEqual(subcmd.call_args[1]["stdout"], subprocess.DEVNULL)
+        self.assertFalse(subcmd.call_args[1]["close_fds"])
+        self.assertEqual(subcmd.call_count, 3)
+
+    def test_service_batch_operations_empty(self, subcmd) -> None:
+        """Test that `slurm_ops` does not run a command if no services are given."""
+        self.manager.enable_services()
+        self.manager.disable_services()
+        self.manager.restart_services()
+        subcmd.assert_not_called()
 
     def test_call_error(self, subcmd) -> None:
         """Test that `slurm_ops` propagates errors when a command fails."""
-        subcmd.return_value = subprocess.CompletedProcess([], returncode=-1, stderr="error")
+        subcmd.return_value = subprocess.CompletedProcess([], returncode=-1, stderr=b"error")
+        with self.assertRaises(SlurmOpsError):
+            self.manager.install()
+
+    def test_call_timeout(self, subcmd) -> None:
+        """Test that `slurm_ops` throws if a command does not complete in time."""
+        subcmd.side_effect = subprocess.TimeoutExpired(["snap", "install", "slurm"], 600)
         with self.assertRaises(SlurmOpsError):
             self.manager.install()
+        self.assertEqual(subcmd.call_args[1]["timeout"], 600)
+
+    @patch("charms.hpc_libs.v0.slurm_ops._executables", {})
+    @patch("charms.hpc_libs.v0.slurm_ops.shutil.which")
+    def test_call_resolve(self, which, subcmd) -> None:
+        """Test that `slurm_ops` only searches `PATH` once for an installed executable."""
+        which.return_value = None
+        self.manager.restart_services(_ServiceType.SLURMCTLD)
+        self.assertIsNone(subcmd.call_args[1]["executable"])
+
+        which.return_value = "/usr/bin/snap"
+        self.manager.restart_services(_ServiceType.SLURMCTLD)
+        self.manager.restart_services(_ServiceType.SLURMCTLD)
+        self.assertEqual(subcmd.call_args[0][0][0], "snap")
+        self.assertEqual(subcmd.call_args[1]["executable"], "/usr/bin/snap")
+        self.assertEqual(which.call_count, 2)
+
+
+@patch("charms.hpc_libs.v0.slurm_ops._snapd_conn", None)
+@patch("charms.hpc_libs.v0.slurm_ops._connect_snapd")
+@patch(
+    "charms.hpc_libs.v0.slurm_ops.subprocess.run",
+    return_value=subprocess.CompletedProcess([], returncode=0),
+)
+class TestSnapdApi(TestCase):
+    def setUp(self):
+        self.setUpPyfakefs()
+        self.manager = _SnapManager()
+        self.fs.create_file("/run/snapd.socket")
+
+    @staticmethod
+    def _respond(conn, body: dict) -> None:
+        conn.return_value.getresponse.return_value.read.return_value = json.dumps(body).encode()
+
+    def test_version(self, subcmd, conn) -> None:
+        """Test that `slurm_ops` gets the installed version from the snapd api."""
+        self._respond(conn, {"type": "sync", "result": {"name": "slurm", "version": "23.11.7"}})
+        self.assertEqual(self.manager.version(), "23.11.7")
+        conn.return_value.request.assert_called_with("GET", "/v2/snaps/slurm")
+        subcmd.assert_not_called()
+
+    def test_version_not_installed(self, subcmd, conn) -> None:
+        """Test that `slurm_ops` throws if snapd reports that the slurm snap is not installed."""
+        self._respond(
+            conn, {"type": "error", "result": {"message": 'snap "slurm" is not installed'}}
+        )
+        with self.assertRaises(SlurmOpsError):
+            self.manager.version()
+
+    def test_version_fallback(self, subcmd, conn) -> None:
+        """Test that `slurm_ops` falls back to `snap list` if snapd cannot be reached."""
+        conn.return_value.request.side_effect = ConnectionRefusedError()
+        subcmd.return_value = subprocess.CompletedProcess(
+            [], returncode=0, stdout=SNAP_SLURM_LIST.encode()
+        )
+        self.assertEqual(self.manager.version(), "23.11.7")
+        self.assertEqual(subcmd.call_args[0][0], ["snap", "list", "slurm"])
+
+    def test_version_fallback_malformed_response(self, subcmd, conn) -> None:
+        """Test that `slurm_ops` falls back to `snap list` if snapd returns a bad response."""
+        subcmd.return_value = subprocess.CompletedProcess(
+            [], returncode=0, stdout=SNAP_SLURM_LIST.encode()
+        )
+        conn.return_value.getresponse.return_value.read.return_value = b'{"type": "sy'
+        self.assertEqual(self.manager.version(), "23.11.7")
+        conn.return_value.getresponse.side_effect = http.client.BadStatusLine("")
+        self.assertEqual(self.manager.version(), "23.11.7")
+        self.assertEqual(subcmd.call_count, 2)
+
+    def test_active(self, subcmd, conn) -> None:
+        """Test that `slurm_ops` gets the state of a service from the snapd api."""
+        service = self.manager.service_manager_for(_ServiceType.SLURMCTLD)
+        self._respond(
+            conn,
+            {
+                "type": "sync",
+                "result": [
+                    {"snap": "slurm", "name": "slurmctld", "daemon": "simple", "active": True}
+                ],
+            },
+        )
+        self.assertTrue(service.active())
+        self._respond(
+            conn,
+            {
+                "type": "sync",
+                "result": [{"snap": "slurm", "name": "slurmctld", "daemon": "simple"}],
+            },
+        )
+        self.assertFalse(service.active())
+        subcmd.assert_not_called()
+
+    def test_connection_reused(self, subcmd, conn) -> None:
+        """Test that `slurm_ops` reuses its connection to snapd between queries."""
+        self._respond(conn, {"type": "sync", "result": {"name": "slurm", "version": "23.11.7"}})
+        self.manager.version()
+        self.manager.version()
+        conn.assert_called_once()
+        self.assertEqual(conn.return_value.request.call_count, 2)
+
+    def test_connection_reset(self, subcmd, conn) -> None:
+        """Test that `slurm_ops` reconnects to snapd if snapd closed the connection."""
+        self._respond(conn, {"type": "sync", "result": {"name": "slurm", "version": "23.11.7"}})
+        conn.return_value.request.side_effect = [ConnectionResetError(), None]
+        self.assertEqual(self.manager.version(), "23.11.7")
+        self.assertEqual(conn.call_count, 2)
+        conn.return_value.close.assert_called_once()
+        subcmd.assert_not_called()
+
+    @patch("charms.hpc_libs.v0.slurm_ops.socket.socket")
+    def test_connection_timeout(self, sock, *_) -> None:
+        """Test that `slurm_ops` does not wait on a stalled snapd forever."""
+        conn = _connect_snapd("/run/snapd.socket")
+        conn.connect()
+        self.assertEqual(conn.timeout, _DEFAULT_TIMEOUT)
+        sock.return_value.settimeout.assert_called_once_with(_DEFAULT_TIMEOUT)
+        sock.return_value.connect.assert_called_once_with("/run/snapd.socket")